@@ -6,4 +6,11 @@ from .proxy import UploaderProxy
 
 __version__ = '0.0.3'
 
-upload = UploaderProxy()
+
+def __getattr__(name):
+    # 默认的 upload 在第一次使用时才创建，避免导入时就读取配置
+    if name == 'upload':
+        global upload
+        upload = UploaderProxy()
+        return upload
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
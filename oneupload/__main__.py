@@ -0,0 +1,5 @@
+import sys
+
+from oneupload.cli import main
+
+sys.exit(main())
@@ -0,0 +1,226 @@
+"""命令行入口
+
+    oneupload a.png b.md
+    find docs -name '*.png' | oneupload
+    oneupload plan a.png b.md
+
+从标准输入读取时，每行是一个文件路径，或者一个 JSON 对象（NDJSON），例如：
+
+    {"path": "a.png", "uploader": "github", "rename": "b.png", "id": 1}
+
+每个文件上传完成后立即输出一行 JSON 结果，顺序与输入不一定相同。
+"""
+import os
+import sys
+import json
+import errno
+import argparse
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Dict, Iterable, Iterator
+
+COMMANDS = ('upload', 'plan')
+
+
+def _common_parser():
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--config', help='用户配置文件路径')
+    parser.add_argument('--home', help='数据目录，默认使用 ONEUPLOAD_HOME')
+    parser.add_argument('-u', '--uploader', action='append',
+                        help='指定 Uploader，多次指定时第一个为主上传，其余为镜像')
+    return parser
+
+
+def _build_parser():
+    common = _common_parser()
+    parser = argparse.ArgumentParser(prog='oneupload')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    upload = commands.add_parser('upload', parents=[common],
+                                 help='上传文件，默认的命令')
+    upload.add_argument('paths', nargs='*',
+                        help='要上传的文件，不指定或者为 - 时从标准输入读取')
+    upload.add_argument('-j', '--jobs', type=int, default=None,
+                        help='同时上传的文件数上限，默认为所选 Uploader 的最大并发数；'
+                             '实际并发数由自适应并发控制在该上限以内调整')
+    upload.add_argument('-p', '--plugin', action='append', dest='plugins', help='使用的插件')
+    upload.add_argument('--no-history', action='store_true', help='不使用历史数据')
+
+    plan = commands.add_parser('plan', parents=[common], help='查看上传计划，不访问网络')
+    plan.add_argument('paths', nargs='+', help='要上传的文件')
+    plan.add_argument('--json', action='store_true', help='以 NDJSON 格式输出')
+    plan.add_argument('--execute', action='store_true', help='生成计划后立即执行')
+    plan.add_argument('-j', '--jobs', type=int, default=None,
+                      help='执行计划时同时上传的文件数，默认为所选 Uploader 的最大并发数')
+    return parser
+
+
+def _make_proxy(args):
+    from oneupload.proxy import UploaderProxy
+    return UploaderProxy(config_path=args.config, home=args.home)
+
+
+def _write(out, data: Dict[str, Any]):
+    out.write(json.dumps(data, ensure_ascii=False) + '\n')
+    out.flush()
+
+
+class _Output:
+    """在多个线程中逐行输出 NDJSON；下游关闭管道（如 ``| head``）后不再输出"""
+
+    def __init__(self, out):
+        self.out = out
+        self.closed = False
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def write(self, data: Dict[str, Any]):
+        with self._lock:
+            self.failed += 'error' in data
+            if self.closed:
+                return
+            try:
+                _write(self.out, data)
+            except OSError as err:
+                if not isinstance(err, BrokenPipeError) and err.errno != errno.EPIPE:
+                    raise
+                self.closed = True
+                self._silence()
+
+    def _silence(self):
+        # 把 stdout 指向 devnull，解释器退出时的 flush 不会再报 BrokenPipeError
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        try:
+            os.dup2(devnull, self.out.fileno())
+        except (AttributeError, OSError, ValueError):
+            pass
+        finally:
+            os.close(devnull)
+
+
+def iter_jobs(paths: Iterable[str], stdin=None) -> Iterator[Dict[str, Any]]:
+    """把命令行参数和标准输入转换为上传任务"""
+    paths = list(paths) or ['-']
+    for path in paths:
+        if path != '-':
+            yield {'path': path}
+            continue
+        for line in stdin or sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('{'):
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield {'error': f'Invalid JSON: {line}'}
+            else:
+                yield {'path': line}
+
+
+def _run_job(proxy, job: Dict[str, Any], defaults: Dict[str, Any]) -> Dict[str, Any]:
+    job = dict(job)
+    result = {'path': job.get('path')}
+    if 'id' in job:
+        result['id'] = job.pop('id')
+    try:
+        kwargs = dict(defaults, **job)
+        result['url'] = proxy.run_upload(kwargs.pop('path'), **kwargs)
+    except Exception as err:
+        result['error'] = str(err) or type(err).__name__
+    return result
+
+
+def _wait_mirrors(proxy) -> int:
+    """等待镜像上传完成，返回失败的数量；失败的镜像不影响已经输出的主链接"""
+    failed = proxy.wait_mirrors()['failed']
+    if failed:
+        print(f'{failed} mirror upload(s) failed', file=sys.stderr)
+    return failed
+
+
+def cmd_upload(args, out) -> int:
+    proxy = _make_proxy(args)
+    defaults = {}
+    if args.uploader:
+        defaults['uploader'] = args.uploader
+    if args.plugins:
+        defaults['plugins'] = args.plugins
+    if args.no_history:
+        defaults['save_history'] = False
+
+    jobs = max(1, args.jobs or proxy.max_concurrency(args.uploader))
+    output = _Output(out)
+    # 限制排队的任务数，输入很多时不会一次全部读入内存
+    slots = threading.BoundedSemaphore(jobs * 4)
+
+    def on_done(future: Future):
+        # 每个上传完成时立即输出，不依赖输入是否读完
+        slots.release()
+        output.write(future.result())
+
+    with proxy.defer_history_save():
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            for job in iter_jobs(args.paths):
+                if output.closed:
+                    # 下游已不再读取结果，不再提交新的任务，已经开始的继续完成
+                    break
+                if not isinstance(job, dict) or 'path' not in job:
+                    error = job.get('error') if isinstance(job, dict) else None
+                    output.write({'path': None, 'error': error or f'Invalid job: {job}'})
+                    continue
+                slots.acquire()
+                executor.submit(_run_job, proxy, job, defaults).add_done_callback(on_done)
+        mirrors_failed = _wait_mirrors(proxy)
+    return 1 if output.failed or mirrors_failed else 0
+
+
+def cmd_plan(args, out) -> int:
+    proxy = _make_proxy(args)
+    kwargs = {'uploader': args.uploader} if args.uploader else {}
+    plan = proxy.plan(args.paths, **kwargs)
+    output = _Output(out)
+    if args.json:
+        for item in plan.items:
+            output.write(item.to_dict())
+    else:
+        out.write(str(plan) + '\n')
+    if not args.execute:
+        return 0
+
+    lock = threading.Lock()
+
+    def on_result(result: Dict[str, Any]):
+        if args.json:
+            output.write(result)
+            return
+        with lock:
+            out.write(f"{result['path']}\t{result.get('url') or 'ERROR: ' + result['error']}\n")
+
+    with proxy.defer_history_save():
+        results = plan.execute(max_workers=args.jobs, on_result=on_result)
+        mirrors_failed = _wait_mirrors(proxy)
+    return 1 if mirrors_failed or any('error' in result for result in results) else 0
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    # 没有指定子命令时默认为 upload
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ('-h', '--help')):
+        argv.insert(0, 'upload')
+    args = _build_parser().parse_args(argv)
+    out = sys.stdout
+    # 上传过程中的提示信息输出到 stderr，stdout 只保留结果
+    with contextlib.redirect_stdout(sys.stderr):
+        from oneupload.proxy import (ConfigError, NoAvailableUploaderError,
+                                     UploaderNotFoundError, UploaderNotAvailableError)
+        try:
+            if args.command == 'plan':
+                return cmd_plan(args, out)
+            return cmd_upload(args, out)
+        except (ConfigError, NoAvailableUploaderError, UploaderNotFoundError,
+                UploaderNotAvailableError, FileNotFoundError) as err:
+            # 参数或配置错误，不输出调用栈
+            print(f'oneupload: error: {err}', file=sys.stderr)
+            return 2
@@ -7,10 +7,12 @@
 from pathlib import Path
 import oss2
 
+from oneupload.compress import Compressor
+
 
 class AliOSS:
     def __init__(self, access_key, access_secret,
-                 bucket, endpoint, path='test'):
+                 bucket, endpoint, path='test', compress=False):
         """
 
         :param access_key: <Access Key ID>
@@ -18,6 +20,7 @@ class AliOSS:
         :param bucket: <Bucket>
         :param endpoint: oss-cn-shanghai.aliyuncs.com
         :param path: 存储路径，默认为空
+        :param compress: 压缩文本类文件后再上传，可以是 gzip 或 br
         """
         auth = oss2.Auth(access_key, access_secret)
         self.bucket = oss2.Bucket(auth, endpoint, bucket)
@@ -31,6 +34,7 @@ class AliOSS:
         else:
             self._host = endpoint
         self.bucket_name = self.bucket.bucket_name
+        self.compressor = Compressor(compress) if compress else None
 
     @property
     def unique_id(self) -> str:
@@ -51,11 +55,14 @@ class AliOSS:
 
         key = self.content_path + remote_name
         content = local_file.read_bytes()
-        self.upload_content(key, content)
+        self.upload_content(key, content, local_file=local_file)
         return f"https://{self.bucket_name}.{self._host}/{key}"
 
-    def upload_content(self, key, content):
-        self.bucket.put_object(key, content)
+    def upload_content(self, key, content, local_file=None):
+        headers = None
+        if self.compressor:
+            content, headers = self.compressor.compress(key, content, path=local_file)
+        self.bucket.put_object(key, content, headers=headers)
 
     def list_objects(self):
         # Traverse all objects in the bucket
@@ -5,6 +5,10 @@ from urllib.error import HTTPError
 from urllib.parse import urlencode
 from urllib.request import urlopen, build_opener, Request
 from pathlib import Path
+from typing import Mapping
+
+# 分块读取文件的大小，必须是 3 的倍数，这样每块的 base64 编码可以直接拼接
+CHUNK_SIZE = 3 * 256 * 1024
 
 
 def github_sha(content):
@@ -14,17 +18,64 @@ def github_sha(content):
     https://stackoverflow.com/questions/7225313/how-does-git-compute-file-hashes
     """
     head = f'blob {len(content)}\0'.encode()
-    return hashlib.sha1(head + content).hexdigest()
+    sha = hashlib.sha1(head)
+    sha.update(content)
+    return sha.hexdigest()
+
+
+def github_file_sha(path, chunk_size=CHUNK_SIZE):
+    """Generate SHA hashes of a file, reading it chunk by chunk"""
+    path = Path(path)
+    sha = hashlib.sha1(f'blob {path.stat().st_size}\0'.encode())
+    with path.open('rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class ContentBody:
+    """流式生成 contents API 的 JSON 请求体
+
+    ``content`` 字段在发送时边读文件边进行 base64 编码，内存占用与文件大小无关。
+    可以多次迭代，每次都重新读取文件，所以可以用于重试。
+    """
+
+    def __init__(self, path, chunk_size=CHUNK_SIZE, **fields):
+        assert chunk_size % 3 == 0, 'chunk_size must be a multiple of 3'
+        self.path = Path(path)
+        self.chunk_size = chunk_size
+        self.size = self.path.stat().st_size
+        head = json.dumps(fields)[:-1]
+        if fields:
+            head += ', '
+        self._prefix = (head + '"content": "').encode('ascii')
+        self._suffix = b'"}'
+
+    def __len__(self):
+        encoded_size = (self.size + 2) // 3 * 4
+        return len(self._prefix) + encoded_size + len(self._suffix)
+
+    def __iter__(self):
+        yield self._prefix
+        with self.path.open('rb') as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), b''):
+                yield base64.b64encode(chunk)
+        yield self._suffix
 
 
 class GitHub:
-    def __init__(self, owner, repo, token, path=''):
+    limiter = None  # 由 Uploader 设置，用于上报 X-RateLimit-* 响应头
+    # 同一个仓库的提交必须串行，并发写入 contents API 会返回 409 冲突
+    max_concurrency = 1
+
+    def __init__(self, owner, repo, token, path='', cdn=False):
         self.owner = owner
         self.token = token
         self.repo = repo
         self.path = path.strip()  # 默认的存储路径
         if self.path and not self.path.endswith('/'):
             self.path += '/'
+        self.use_cdn = cdn  # 默认是否返回 CDN 链接
         self.headers = {
             'Accept': 'application/vnd.github.v3+json',
             'Authorization': 'token ' + self.token
@@ -39,12 +90,17 @@ class GitHub:
     def _request(self, url, data=None, headers=None, method='GET'):
         headers = headers or self.headers
         if data is not None:
-            if not isinstance(data, (str, bytes)):
+            if isinstance(data, Mapping):
                 data = urlencode(data)
-            if not isinstance(data, bytes):
+            if isinstance(data, str):
                 data = data.encode('ascii')
+            if not isinstance(data, bytes):
+                # 可迭代的请求体，需要给出长度，否则会使用 chunked 编码
+                headers = dict(headers, **{'Content-Length': str(len(data))})
         req = Request(url, data=data, headers=headers, method=method.upper())
         res = urlopen(req)
+        if self.limiter is not None:
+            self.limiter.observe_headers(res.headers)
         return json.load(res) if res else {}
 
     def get(self, url):
@@ -67,6 +123,17 @@ class GitHub:
         body = {'message': message, 'content': content, 'sha': sha}
         return self.put(url, data=json.dumps(body))
 
+    def create_or_update_file(self, path, local_file, message=None, sha=None):
+        """同 ``create_or_update_content``，但直接从本地文件流式上传"""
+        url = f'https://api.github.com/repos/{self.owner}/{self.repo}/contents/{path}'
+        if message is None:
+            if sha:
+                message = f'Update {path}'
+            else:
+                message = f'Create {path}'
+        body = ContentBody(local_file, message=message, sha=sha)
+        return self.put(url, data=body)
+
     def _gh_path(self, filename):
         return self.path + filename
 
@@ -89,7 +156,23 @@ class GitHub:
             else:
                 raise
 
-    def upload(self, path, rename=None, cdn=False, overwrite=True):
+    def upload_file(self, path, local_file, message=None, overwrite=True, **kwargs):
+        try:
+            self.create_or_update_file(path, local_file, message=message)
+        except HTTPError as err:
+            if err.code == 422:
+                # 只有文件已存在时才需要比较 sha，避免每次上传都多读一遍文件
+                sha = self.get_content(path)['sha']
+                if sha == github_file_sha(local_file):
+                    print(f"{path} already exist and has the same content, pass.")
+                elif overwrite:
+                    self.create_or_update_file(path, local_file,
+                                               message=message,
+                                               sha=sha)
+            else:
+                raise
+
+    def upload(self, path, rename=None, cdn=None, overwrite=True):
         path = Path(path)
         if rename:
             if isinstance(rename, str):
@@ -102,7 +185,9 @@ class GitHub:
             remote_name = path.name
         message = f"upload {remote_name}"
         gh_path = self._gh_path(remote_name)
-        self.upload_content(gh_path, path.read_bytes(), message, overwrite=overwrite)
+        self.upload_file(gh_path, path, message, overwrite=overwrite)
+        if cdn is None:
+            cdn = self.use_cdn
         if cdn:
             return self.cdn(gh_path)
         else:
@@ -0,0 +1,330 @@
+"""S3 compatible Client
+
+支持 AWS S3、MinIO、Cloudflare R2 等兼容 S3 协议的存储，只使用标准库。
+
+大文件使用分片上传，各分片并发上传；连接放在连接池中复用。
+
+"""
+import hmac
+import queue
+import hashlib
+import threading
+import http.client
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote, urlsplit
+from xml.etree import ElementTree
+
+from oneupload.compress import Compressor, content_type
+
+EMPTY_SHA256 = hashlib.sha256(b'').hexdigest()
+
+MB = 1024 * 1024
+
+POOL_SIZE = 8  # 连接池的最小大小
+
+
+class S3Error(Exception):
+    def __init__(self, status, reason, body=b'', headers=None):
+        self.status = status
+        self.reason = reason
+        self.body = body
+        self.headers = headers or {}
+        super().__init__(f'{status} {reason}: {body[:500].decode(errors="replace")}')
+
+
+def _hmac(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode(), hashlib.sha256).digest()
+
+
+def _uri_encode(text: str, safe='-_.~') -> str:
+    return quote(text, safe=safe)
+
+
+def sign_v4(method: str, path: str, query: Dict[str, str], headers: Dict[str, str],
+            payload_hash: str, access_key: str, access_secret: str,
+            region: str, service='s3', now: Optional[datetime] = None) -> Dict[str, str]:
+    """AWS Signature Version 4，返回加上签名后的请求头
+
+    ``path`` 是已经编码好的路径；``headers`` 中必须包含 ``host``。
+
+    See:
+    https://docs.aws.amazon.com/AmazonS3/latest/API/sig-v4-header-based-auth.html
+    """
+    now = now or datetime.now(timezone.utc)
+    amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+    date = amz_date[:8]
+
+    headers = {k.lower(): str(v).strip() for k, v in headers.items()}
+    headers['x-amz-date'] = amz_date
+    headers['x-amz-content-sha256'] = payload_hash
+
+    signed_headers = ';'.join(sorted(headers))
+    canonical_headers = ''.join(f'{k}:{headers[k]}\n' for k in sorted(headers))
+    canonical_query = '&'.join(f'{_uri_encode(k)}={_uri_encode(v)}'
+                               for k, v in sorted(query.items()))
+    canonical_request = '\n'.join([method, path, canonical_query,
+                                   canonical_headers, signed_headers, payload_hash])
+
+    scope = f'{date}/{region}/{service}/aws4_request'
+    string_to_sign = '\n'.join(['AWS4-HMAC-SHA256', amz_date, scope,
+                                hashlib.sha256(canonical_request.encode()).hexdigest()])
+    key = _hmac(('AWS4' + access_secret).encode(), date)
+    key = _hmac(key, region)
+    key = _hmac(key, service)
+    key = _hmac(key, 'aws4_request')
+    signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+    headers['authorization'] = (f'AWS4-HMAC-SHA256 Credential={access_key}/{scope}, '
+                                f'SignedHeaders={signed_headers}, Signature={signature}')
+    return headers
+
+
+class ConnectionPool:
+    """同一个主机的长连接池，可以在多个线程中使用"""
+
+    def __init__(self, scheme, netloc, size=POOL_SIZE, timeout=60):
+        self.scheme = scheme
+        self.netloc = netloc
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=size)
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(self.netloc, timeout=self.timeout)
+
+    def _get(self) -> Tuple[http.client.HTTPConnection, bool]:
+        """返回一个连接，以及是否为池中复用的连接"""
+        try:
+            return self._pool.get_nowait(), True
+        except queue.Empty:
+            return self._new_connection(), False
+
+    def _put(self, conn):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def request(self, method, url, body=None, headers=None) -> Tuple[int, str, Dict[str, str], bytes]:
+        """发送请求，返回 (状态码, 原因, 响应头, 响应内容)"""
+        conn, reused = self._get()
+        while True:
+            sent = False
+            try:
+                conn.request(method, url, body=body, headers=headers or {})
+                sent = True
+                res = conn.getresponse()
+                data = res.read()
+            except (http.client.HTTPException, OSError) as err:
+                conn.close()
+                # 池中的连接可能已被服务端关闭：发送失败，或者服务端没有任何响应就断开时，
+                # 请求没有被处理，换一个新连接重试。超时等其他错误不重试，避免重复执行请求
+                stale = not sent or isinstance(err, http.client.RemoteDisconnected)
+                if not (reused and stale):
+                    raise
+                conn, reused = self._new_connection(), False
+                continue
+            if res.will_close:
+                conn.close()
+            else:
+                self._put(conn)
+            return res.status, res.reason, dict(res.getheaders()), data
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class S3:
+    limiter = None  # 由 Uploader 设置，用于上报限流相关的响应头
+
+    def __init__(self, access_key, access_secret, bucket, endpoint,
+                 region='us-east-1', path='', url_base='', path_style=True,
+                 pool_size=None, multipart_threshold=16 * MB, part_size=8 * MB,
+                 max_workers=4, compress=False):
+        """
+
+        :param access_key: <Access Key ID>
+        :param access_secret: <Secret Access Key>
+        :param bucket: <Bucket>
+        :param endpoint: https://s3.us-east-1.amazonaws.com 或 http://localhost:9000
+        :param region: 区域，MinIO 和 R2 可以使用默认值（R2 为 auto）
+        :param path: 存储路径，默认为空
+        :param url_base: 返回链接的前缀，例如自定义域名，默认根据 endpoint 生成
+        :param path_style: 使用 endpoint/bucket/key 形式的地址，否则使用 bucket.endpoint/key
+        :param pool_size: 连接池大小，默认为 Uploader 的最大并发数乘以 max_workers
+        :param multipart_threshold: 超过该大小的文件使用分片上传
+        :param part_size: 分片大小，S3 要求至少 5MB
+        :param max_workers: 分片上传的并发数
+        :param compress: 压缩文本类文件后再上传，可以是 gzip 或 br；分片上传的大文件不压缩
+        """
+        if '://' not in endpoint:
+            endpoint = 'https://' + endpoint
+        parts = urlsplit(endpoint)
+        self.scheme = parts.scheme
+        self.path_style = path_style
+        self._host = parts.netloc if path_style else f'{bucket}.{parts.netloc}'
+        self._endpoint_host = parts.netloc
+        self.access_key = access_key
+        self.access_secret = access_secret
+        self.bucket_name = bucket
+        self.region = region
+        path = path.strip()
+        if path and not path.endswith('/'):
+            path += '/'
+        self.content_path = path
+        if url_base:
+            self.url_base = url_base.rstrip('/')
+        elif path_style:
+            self.url_base = f'{self.scheme}://{self._host}/{bucket}'
+        else:
+            self.url_base = f'{self.scheme}://{self._host}'
+        self.multipart_threshold = max(multipart_threshold, 5 * MB)
+        self.part_size = max(part_size, 5 * MB)
+        self.max_workers = max_workers
+        self.pool_size = pool_size
+        self._pool: Optional[ConnectionPool] = None
+        self._pool_lock = threading.Lock()
+        self.compressor = Compressor(compress) if compress else None
+
+    @property
+    def unique_id(self) -> str:
+        return f's3/{self._endpoint_host}/{self.bucket_name}'
+
+    @property
+    def pool(self) -> ConnectionPool:
+        """连接池，第一次使用时才创建，这时 Uploader 已经设置好 limiter"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    size = self.pool_size
+                    if not size:
+                        # 每个上传最多同时占用 max_workers 个连接（分片上传时）
+                        concurrency = self.limiter.maximum if self.limiter is not None else 1
+                        size = max(POOL_SIZE, concurrency * self.max_workers)
+                    self._pool = ConnectionPool(self.scheme, self._host, size=size)
+        return self._pool
+
+    def _object_path(self, key: str) -> str:
+        path = '/' + _uri_encode(key, safe='-_.~/')
+        if self.path_style:
+            path = f'/{self.bucket_name}' + path
+        return path
+
+    def _request(self, method, key, query=None, headers=None, body=b'', payload_hash=None):
+        query = query or {}
+        path = self._object_path(key)
+        if payload_hash is None:
+            payload_hash = hashlib.sha256(body).hexdigest() if body else EMPTY_SHA256
+        headers = dict(headers or {}, host=self._host)
+        headers = sign_v4(method, path, query, headers, payload_hash,
+                          self.access_key, self.access_secret, self.region)
+        url = path
+        if query:
+            url += '?' + '&'.join(f'{_uri_encode(k)}={_uri_encode(v)}' if v else _uri_encode(k)
+                                  for k, v in sorted(query.items()))
+        status, reason, res_headers, data = self.pool.request(method, url, body=body or None,
+                                                              headers=headers)
+        if status >= 300:
+            raise S3Error(status, reason, data, res_headers)
+        if self.limiter is not None:
+            self.limiter.observe_headers(res_headers)
+        return res_headers, data
+
+    def upload(self, local_file, rename=None):
+        local_file = Path(local_file)
+        if rename:
+            if isinstance(rename, str):
+                remote_name = rename
+            elif callable(rename):
+                remote_name = rename(local_file)
+            else:
+                raise ValueError("rename must be a function or str.")
+        else:
+            remote_name = local_file.name
+        remote_name = remote_name.replace(' ', '-')
+
+        key = self.content_path + remote_name
+        self.upload_file(key, local_file)
+        return self.url(key)
+
+    def url(self, key):
+        return f'{self.url_base}/{_uri_encode(key, safe="-_.~/")}'
+
+    def upload_content(self, key, content, headers=None, local_file=None):
+        if not isinstance(content, bytes):
+            content = content.encode()
+        if self.compressor:
+            content, default_headers = self.compressor.compress(key, content, path=local_file)
+        else:
+            default_headers = {'Content-Type': content_type(key)}
+        headers = dict(default_headers, **(headers or {}))
+        self._request('PUT', key, headers=headers, body=content)
+
+    def upload_file(self, key, local_file, headers=None):
+        local_file = Path(local_file)
+        size = local_file.stat().st_size
+        if size <= self.multipart_threshold:
+            self.upload_content(key, local_file.read_bytes(), headers=headers,
+                                local_file=local_file)
+        else:
+            self.multipart_upload(key, local_file, size, headers=headers)
+
+    def multipart_upload(self, key, local_file, size, headers=None):
+        """分片上传，各分片在线程池中并发上传，失败时取消整个上传"""
+        headers = dict({'Content-Type': content_type(key)}, **(headers or {}))
+        _, data = self._request('POST', key, query={'uploads': ''}, headers=headers)
+        upload_id = _find_text(data, 'UploadId')
+
+        def upload_part(number):
+            offset = (number - 1) * self.part_size
+            with local_file.open('rb') as f:
+                f.seek(offset)
+                chunk = f.read(self.part_size)
+            res_headers, _ = self._request('PUT', key,
+                                           query={'partNumber': str(number), 'uploadId': upload_id},
+                                           body=chunk)
+            return number, _get_header(res_headers, 'ETag')
+
+        part_count = (size + self.part_size - 1) // self.part_size
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                etags = list(executor.map(upload_part, range(1, part_count + 1)))
+            body = ''.join(f'<Part><PartNumber>{n}</PartNumber><ETag>{etag}</ETag></Part>'
+                           for n, etag in etags)
+            body = f'<CompleteMultipartUpload>{body}</CompleteMultipartUpload>'.encode()
+            _, data = self._request('POST', key, query={'uploadId': upload_id}, body=body)
+            # 合并失败时也可能返回 200，错误信息在响应内容中
+            if b'<Error>' in data:
+                raise S3Error(200, 'CompleteMultipartUpload failed', data)
+        except BaseException:
+            try:
+                self._request('DELETE', key, query={'uploadId': upload_id})
+            except (S3Error, OSError):
+                pass
+            raise
+
+    def match(self, url):
+        return url.startswith(self.url_base + '/')
+
+
+def _find_text(xml: bytes, tag: str) -> str:
+    for elem in ElementTree.fromstring(xml).iter():
+        if elem.tag == tag or elem.tag.endswith('}' + tag):
+            return elem.text or ''
+    raise S3Error(200, f'{tag} not found', xml)
+
+
+def _get_header(headers: Dict[str, str], name: str) -> str:
+    name = name.lower()
+    for k, v in headers.items():
+        if k.lower() == name:
+            return v
+    return ''
@@ -0,0 +1,138 @@
+"""上传前压缩文本类文件
+
+对象存储（AliOSS、S3）开启 ``compress`` 后，SVG、Markdown、JSON、CSS 等文本文件
+先压缩再上传，并设置 ``Content-Encoding`` 和 ``Content-Type``，浏览器会自动解压。
+
+使用 brotli 需要先安装依赖:
+    pip install brotli
+
+"""
+import os
+import gzip
+import hashlib
+import mimetypes
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+from oneupload.utils import cached_md5
+
+try:
+    import brotli  # noqa
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    '.svg': 'image/svg+xml',
+    '.md': 'text/markdown; charset=utf-8',
+    '.markdown': 'text/markdown; charset=utf-8',
+    '.txt': 'text/plain; charset=utf-8',
+    '.json': 'application/json',
+    '.css': 'text/css',
+    '.js': 'application/javascript',
+    '.html': 'text/html; charset=utf-8',
+    '.htm': 'text/html; charset=utf-8',
+    '.xml': 'application/xml',
+    '.csv': 'text/csv; charset=utf-8',
+}
+
+MIN_SIZE = 1024  # 太小的文件压缩后节省不了多少，不压缩
+CACHE_BYTES = 64 * 1024 * 1024  # 压缩结果缓存占用的最大字节数
+
+# 压缩是 CPU 密集的操作，所有上传线程共用一个线程池，同时压缩的数量不超过 CPU 核数；
+# zlib 和 brotli 压缩时会释放 GIL，可以真正并行
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1,
+                                           thread_name_prefix='oneupload-compress')
+        return _executor
+
+
+# 所有 Compressor 共用的压缩结果缓存：(md5, encoding) -> 压缩后的内容，按字节数淘汰；
+# 同一个文件上传到多个镜像时只压缩一次
+_cache: 'OrderedDict[Tuple[str, str], bytes]' = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+
+
+def _cache_get(key: Tuple[str, str]) -> Optional[bytes]:
+    with _cache_lock:
+        compressed = _cache.get(key)
+        if compressed is not None:
+            _cache.move_to_end(key)
+        return compressed
+
+
+def _cache_put(key: Tuple[str, str], compressed: bytes):
+    global _cache_bytes
+    if len(compressed) > CACHE_BYTES:
+        return
+    with _cache_lock:
+        if key in _cache:
+            return
+        _cache[key] = compressed
+        _cache_bytes += len(compressed)
+        while _cache_bytes > CACHE_BYTES:
+            _, evicted = _cache.popitem(last=False)
+            _cache_bytes -= len(evicted)
+
+
+def content_type(name: str) -> str:
+    ext = os.path.splitext(name)[1].lower()
+    if ext in COMPRESSIBLE_TYPES:
+        return COMPRESSIBLE_TYPES[ext]
+    return mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+
+class Compressor:
+    def __init__(self, encoding='gzip', min_size=MIN_SIZE):
+        """
+
+        :param encoding: gzip 或 br，没有安装 brotli 时使用 gzip
+        :param min_size: 小于该大小的文件不压缩
+        """
+        if encoding in (True, 'true'):
+            encoding = 'gzip'
+        if encoding == 'br' and brotli is None:
+            print('要使用 brotli 压缩需要安装 brotli 模块，改为使用 gzip')
+            encoding = 'gzip'
+        if encoding not in ('gzip', 'br'):
+            raise ValueError(f'Unsupported encoding: {encoding}')
+        self.encoding = encoding
+        self.min_size = min_size
+
+    def _compress(self, content: bytes) -> bytes:
+        if self.encoding == 'br':
+            return brotli.compress(content)
+        return gzip.compress(content, compresslevel=9, mtime=0)
+
+    def compress(self, name: str, content: bytes,
+                 path: Union[str, Path, None] = None) -> Tuple[bytes, Dict[str, str]]:
+        """返回要上传的内容和请求头，不需要压缩时返回原内容
+
+        :param path: ``content`` 读取自的本地文件，可以复用上传前已经计算好的 md5
+        """
+        headers = {'Content-Type': content_type(name)}
+        ext = os.path.splitext(name)[1].lower()
+        if ext not in COMPRESSIBLE_TYPES or len(content) < self.min_size:
+            return content, headers
+
+        digest = cached_md5(path) if path else hashlib.md5(content).hexdigest()
+        cache_key = (digest, self.encoding)
+        compressed = _cache_get(cache_key)
+        if compressed is None:
+            compressed = _get_executor().submit(self._compress, content).result()
+            _cache_put(cache_key, compressed)
+
+        if len(compressed) >= len(content):
+            return content, headers
+        headers['Content-Encoding'] = self.encoding
+        return compressed, headers
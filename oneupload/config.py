@@ -9,7 +9,10 @@ DEFAULT_CONFIG = {
         },
         'command': {
             'path': 'oneupload.clients.command:upload_factory',
-        }
+        },
+        's3': {
+            'path': 'oneupload.clients.s3:S3',
+        },
     },
     'plugin': {
         'logging': 'oneupload.plugin:LoggingPlugin',
@@ -32,6 +35,7 @@ INIT_CONFIG_TEXT = """
 # Access_Key = "<YOUR ACCESS KEY ID>"
 # Access_Secret = "<YOUR ACCESS KEY SECRET>"
 # Bucket = "<YOUR BUCKET NAME>"
+# compress = "gzip"    # 可选，压缩 SVG、Markdown、JSON、CSS 等文本文件，也可以是 "br"
 
 # [uploader.github]
 # 
@@ -40,6 +44,20 @@ INIT_CONFIG_TEXT = """
 # owner = "<YOUR USERNAME>"
 # token = "<YOUR GITHUB TOKEN>"
 # repo  = "<YOUR REPO NAME>"
+# cdn   = true    # 返回 jsDelivr 的 CDN 链接
+
+# [uploader.minio]
+# 
+# client = 's3'
+# 
+# Endpoint = "http://localhost:9000"
+# Access_Key = "<YOUR ACCESS KEY ID>"
+# Access_Secret = "<YOUR SECRET ACCESS KEY>"
+# Bucket = "<YOUR BUCKET NAME>"
+# Region = "us-east-1"     # R2 使用 "auto"
+# URL_Base = ""            # 可选，返回链接使用的域名
+# concurrency = 4          # 初始并发数，会根据延迟和限流情况自动调整
+# max_concurrency = 32     # 并发数上限，默认 32；GitHub 默认为 1
 
 # [uploader.ossutil]
 # 
@@ -49,6 +67,11 @@ INIT_CONFIG_TEXT = """
 # cmd_template = 'ossutil64.exe cp ${file_path} oss://my-bucket/ -f -u'
 # url_template = 'https://my-bucket.oss-cn-hangzhou.aliyuncs.com/${name}'
 
+# [rule.images]
+#
+# pattern = '*.png'
+# uploader = ['alioss', 'github']   # 第一个为主上传，其余为镜像，并发上传
+#
 # [[cases]]
 # 
 # match = '*.png'
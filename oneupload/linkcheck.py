@@ -0,0 +1,104 @@
+"""检查已发布的链接是否仍然可以访问
+
+每个工作线程为每个主机保持一个长连接，使用 HEAD 请求检查，不下载内容。
+
+只有 404、410 说明链接确实失效；超时、限流（429）、服务端错误（5xx）以及
+不支持 HEAD（405）等情况无法确定链接的状态，不应该当作失效处理。
+"""
+import socket
+import http.client
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Tuple
+from urllib.parse import urlsplit
+
+MAX_WORKERS = 32
+TIMEOUT = 10
+
+BROKEN_STATUS = (404, 410)
+
+
+class LinkChecker:
+    def __init__(self, max_workers=MAX_WORKERS, timeout=TIMEOUT):
+        """
+
+        :param max_workers: 最大并发请求数
+        :param timeout: 单个请求的超时时间（秒）
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections = []  # 所有线程创建的连接，检查结束后统一关闭
+        self._dead_hosts = set()  # 拒绝连接或无法解析的主机，其余链接直接跳过
+        self._lock = threading.Lock()
+
+    def _connection(self, scheme, netloc) -> Tuple[http.client.HTTPConnection, bool]:
+        """返回当前线程到该主机的连接，以及是否为复用的连接"""
+        pool = getattr(self._local, 'pool', None)
+        if pool is None:
+            pool = self._local.pool = {}
+        key = (scheme, netloc)
+        conn = pool.get(key)
+        if conn is not None and conn.sock is not None:
+            return conn, True
+        if conn is None:
+            if scheme == 'https':
+                conn = http.client.HTTPSConnection(netloc, timeout=self.timeout)
+            else:
+                conn = http.client.HTTPConnection(netloc, timeout=self.timeout)
+            pool[key] = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn, False
+
+    def check(self, url: str) -> int:
+        """返回 HEAD 请求的状态码，无法连接时返回 0"""
+        parts = urlsplit(url)
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+        if parts.netloc in self._dead_hosts:
+            return 0
+        while True:
+            conn, reused = self._connection(parts.scheme, parts.netloc)
+            try:
+                conn.request('HEAD', target)
+                res = conn.getresponse()
+                res.read()
+                if res.will_close:
+                    conn.close()
+                return res.status
+            except (http.client.HTTPException, OSError) as err:
+                conn.close()
+                # 复用的连接可能已被服务端关闭，用新连接重试
+                if not reused:
+                    # 超时等错误可能只是个别请求慢，只有拒绝连接或域名无法解析才说明主机不可用
+                    if isinstance(err, (ConnectionRefusedError, socket.gaierror)):
+                        with self._lock:
+                            self._dead_hosts.add(parts.netloc)
+                    return 0
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+
+    def check_all(self, urls: Iterable[str]) -> Dict[str, int]:
+        """并发检查多个链接，返回链接到状态码的映射"""
+        urls = list(dict.fromkeys(urls))
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers,
+                                    thread_name_prefix='oneupload-linkcheck') as executor:
+                return dict(zip(urls, executor.map(self.check, urls)))
+        finally:
+            self.close()
+
+
+def is_alive(status: int) -> bool:
+    return 0 < status < 400
+
+
+def is_broken(status: int) -> bool:
+    """链接确实已经失效，可以重新上传"""
+    return status in BROKEN_STATUS
@@ -1,21 +1,27 @@
 import os
 import re
 import json
+import time
 import inspect
+import threading
 import contextlib
+from concurrent.futures import ThreadPoolExecutor, Future, wait
 from datetime import datetime
 from dataclasses import dataclass
 from pathlib import Path
 from fnmatch import fnmatch
-from typing import Callable, Optional, Dict, Any, Union, List
+from urllib.parse import unquote, urlsplit
+from typing import Callable, Optional, Dict, Any, Union, List, NamedTuple, Tuple, Iterable, Set
 
 try:
     import tomllib as toml
 except ImportError:
     import tomli as toml
 
-from oneupload.utils import get_app_dir, import_module, md5
+from oneupload.utils import get_app_dir, import_module, md5, cached_md5
 from oneupload.config import DEFAULT_CONFIG, INIT_CONFIG_TEXT
+from oneupload.linkcheck import LinkChecker, is_alive, is_broken, MAX_WORKERS
+from oneupload.throttle import AdaptiveLimiter, is_throttle_error, backoff
 
 PACKAGE_NAME = 'oneupload'
 
@@ -27,6 +33,11 @@ CONFIG_FILE = 'config.toml'
 USER_CONFIG_FILE = 'user_config.toml'
 HISTORY_DATA_FILE = 'history.json'
 
+MIRROR_WORKERS = 4
+THROTTLE_RETRIES = 6
+HISTORY_FLUSH_INTERVAL = 5  # 推迟保存历史数据时，最长的保存间隔（秒）
+HASH_WORKERS = min(8, os.cpu_count() or 1)
+
 
 class ConfigError(Exception):
     pass
@@ -91,9 +102,12 @@ class Uploader:
     unique_id: Optional[str] = None
     instance: Optional[Any] = None
     upload_method: Optional[Callable[..., str]] = None
+    limiter: Optional[AdaptiveLimiter] = None
 
     def __post_init__(self):
         print(f'Initialize Uploader: {self.name}')
+        if self.limiter is None:
+            self.limiter = AdaptiveLimiter()
         if self.client.available():
             kwargs = {k.lower(): v for k, v in self.args.items()}
             self.instance = self.client.build(**kwargs)
@@ -108,22 +122,146 @@ class Uploader:
             if not self.unique_id:
                 default_unique_id = self.name
                 self.unique_id = getattr(self.instance, 'unique_id', default_unique_id)
+            # 客户端可以通过 limiter 上报限流相关的响应头
+            if hasattr(self.instance, 'limiter'):
+                self.instance.limiter = self.limiter
         else:
             print(f'Uploader cannot work because of client is unavailable: {self.name}')
 
     def upload(self, path, **kwargs) -> str:
-        return self.upload_method(path, **kwargs)
+        """在并发控制下上传，被限流时等待后重试"""
+        size = Path(path).stat().st_size
+        for attempt in range(1, THROTTLE_RETRIES + 1):
+            try:
+                with self.limiter.slot(size):
+                    return self.upload_method(path, **kwargs)
+            except Exception as err:
+                if attempt == THROTTLE_RETRIES or not is_throttle_error(err):
+                    raise
+                delay = backoff(attempt - 1)
+                print(f'Uploader {self.name} is throttled, retry in {delay:.1f}s: {err}')
+                time.sleep(delay)
 
     def available(self):
         return callable(self.upload_method)
 
+    def match(self, url: str) -> bool:
+        """链接是否属于该 Uploader，需要客户端提供 ``match`` 方法"""
+        match = getattr(self.instance, 'match', None)
+        return bool(match and match(url))
+
+
+@dataclass
+class PlanItem:
+    """上传计划中的一个文件"""
+    path: Path
+    file_key: str
+    size: int
+    uploader: str
+    mirrors: List[str]
+    rule: Optional[str] = None
+    plugins: Optional[List[str]] = None
+    kwargs: Optional[Dict[str, Any]] = None
+    hits: Optional[Dict[str, str]] = None  # 历史中已有的链接: {uploader: url}
+    save_history: bool = True
+
+    @property
+    def to_upload(self) -> List[str]:
+        """需要真正上传的 Uploader"""
+        return [name for name in [self.uploader] + self.mirrors
+                if name not in self.hits]
+
+    @property
+    def bytes_to_send(self) -> int:
+        return self.size * len(self.to_upload)
+
+    @property
+    def status(self) -> str:
+        if not self.to_upload:
+            return 'history'
+        if self.hits:
+            return 'partial'
+        return 'upload'
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'path': self.path.as_posix(), 'hash': self.file_key,
+                'size': self.size, 'rule': self.rule,
+                'uploader': self.uploader, 'mirrors': self.mirrors,
+                'status': self.status, 'hits': self.hits,
+                'bytes_to_send': self.bytes_to_send}
+
+
+@dataclass
+class UploadPlan:
+    """批量上传计划，由 ``UploaderProxy.plan`` 生成，不访问网络"""
+    proxy: 'UploaderProxy'
+    items: List[PlanItem]
+
+    @property
+    def bytes_to_send(self) -> int:
+        return sum(item.bytes_to_send for item in self.items)
+
+    def summary(self) -> Dict[str, int]:
+        result = {'files': len(self.items), 'bytes_to_send': self.bytes_to_send}
+        for item in self.items:
+            result[item.status] = result.get(item.status, 0) + 1
+        return result
+
+    def execute(self, max_workers: Optional[int] = None,
+                on_result: Optional[Callable[[Dict[str, Any]], Any]] = None) -> List[Dict[str, Any]]:
+        """按计划并发上传，复用计划中已经算好的哈希和规则
+
+        某个文件上传失败不影响其他文件，返回与 ``items`` 顺序相同的结果，
+        每项为 ``{'path': ..., 'url': ...}`` 或 ``{'path': ..., 'error': ...}``。
+
+        :param max_workers: 同时上传的文件数，默认为计划中 Uploader 的最大并发数
+        :param on_result: 每个文件完成时立即以结果调用，可以用于流式输出
+        """
+        if not self.items:
+            return []
+        if not max_workers:
+            names = dict.fromkeys(name for item in self.items
+                                  for name in [item.uploader] + item.mirrors)
+            max_workers = self.proxy.max_concurrency(list(names))
+
+        def run(item: PlanItem) -> Dict[str, Any]:
+            result = {'path': item.path.as_posix()}
+            try:
+                result['url'] = self.proxy.run_plan_item(item)
+            except Exception as err:
+                result['error'] = str(err) or type(err).__name__
+            if on_result is not None:
+                on_result(result)
+            return result
+
+        with self.proxy.defer_history_save():
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(self.items))) as executor:
+                return list(executor.map(run, self.items))
+
+    def __str__(self):
+        lines = []
+        for item in self.items:
+            uploaders = ', '.join([item.uploader] + item.mirrors)
+            lines.append(f'{item.status:8} {item.bytes_to_send:>12} '
+                         f'{item.path.as_posix()} -> {uploaders}'
+                         + (f' (rule: {item.rule})' if item.rule else ''))
+        lines.append(' '.join(f'{k}={v}' for k, v in self.summary().items()))
+        return '\n'.join(lines)
+
+
+class LinkRecord(NamedTuple):
+    """链接对应的历史数据"""
+    file_key: Optional[str]
+    path: Optional[str]
+    uploader: Optional[str]
+
 
 @dataclass
 class UploadRule:
     """上传规则"""
     name: str
     pattern: str
-    uploader: str
+    uploader: Union[str, List[str]]
     match_method: str = 'fnmatch'
     plugins: List[str] = None
 
@@ -139,6 +277,24 @@ class UploadRule:
             return eval(self.pattern)
         return False
 
+    @property
+    def uploaders(self) -> List[str]:
+        """规则对应的所有 Uploader，第一个为主上传，其余为镜像"""
+        return _as_uploader_list(self.uploader)
+
+
+def _remote_name(url: str) -> str:
+    """从链接中取出远程文件名"""
+    return unquote(urlsplit(url).path.rsplit('/', 1)[-1])
+
+
+def _as_uploader_list(names: Union[str, List[str], None]) -> List[str]:
+    if not names:
+        return []
+    if isinstance(names, str):
+        return [names]
+    return list(names)
+
 
 class UploaderProxy:
     """Upload files through uploader."""
@@ -177,11 +333,20 @@ class UploaderProxy:
 
         self._selected_uploader = None
 
+        self._history_lock = threading.RLock()
+        self._mirror_executor: Optional[ThreadPoolExecutor] = None
+        self._mirror_futures: Set[Future] = set()  # 尚未完成的镜像上传
+        self._mirror_stats = {'done': 0, 'failed': 0}
+
         self._history_data_path = self._home.joinpath(HISTORY_DATA_FILE)
-        if self._history_data_path.is_file():
-            self._history_data = json.loads(self._history_data_path.read_text(encoding='utf-8'))
-        else:
-            self._history_data = {}
+        self._history_data = {}
+        self._history_stat = None
+        self._history_dirty = False
+        self._history_deferred = 0
+        self._history_saved_at = 0.0
+        self._history_version = 0  # 历史数据每次变化时加一，用于判断缓存是否过期
+        self._link_index: Optional[Tuple[int, Dict[str, LinkRecord]]] = None
+        self._load_history_data()
 
     def _load_config(self):
         app_config = toml.loads(self._app_config_path.read_text(encoding='utf-8'))
@@ -226,7 +391,13 @@ class UploaderProxy:
                 print(f'Client {client_name} not available!')
                 continue
             priority = uploader_cfg.pop('priority', 5)
-            ue = Uploader(name, client=client, priority=priority, args=uploader_cfg)
+            # 客户端可以声明自己的并发上限，例如 GitHub contents API 需要串行提交
+            max_concurrency = uploader_cfg.pop(
+                'max_concurrency', getattr(client.factory, 'max_concurrency', 32))
+            limiter = AdaptiveLimiter(initial=uploader_cfg.pop('concurrency', 4),
+                                      maximum=max_concurrency)
+            ue = Uploader(name, client=client, priority=priority, args=uploader_cfg,
+                          limiter=limiter)
             if not ue.available():
                 print(f'Uploader {name} not available!')
             if ue.name not in _uploaders:
@@ -248,8 +419,9 @@ class UploaderProxy:
         for name in self._cfg_rules:
             rule_cfg = self._cfg_rules[name]
             uploader_name = rule_cfg.pop('uploader')
-            if uploader_name not in self._uploaders:
-                raise ConfigError(f'uploader {uploader_name} not exists.')
+            for _name in _as_uploader_list(uploader_name):
+                if _name not in self._uploaders:
+                    raise ConfigError(f'uploader {_name} not exists.')
             rule = UploadRule(name, uploader=uploader_name, **rule_cfg)
             _rules[name] = rule
         return _rules
@@ -269,26 +441,108 @@ class UploaderProxy:
         if not path.exists():
             raise FileNotFoundError(f'{path} 不存在。')
 
-        uploader_name = kwargs.pop('uploader', '')
+        _, uploader, mirrors, plugins = self._resolve(path, kwargs)
+
+        save_history = kwargs.pop('save_history', True)
+        if save_history:
+            return self._upload_with_history_data(path, uploader, plugins, kwargs, mirrors)
+        else:
+            self._upload_mirrors(path, mirrors, kwargs)
+            return self._upload(path, uploader.upload, plugins, kwargs)
+
+    def _resolve(self, path: Path, kwargs) -> Tuple[Optional[UploadRule], Uploader,
+                                                    List[Uploader], List[str]]:
+        """根据参数和规则确定 Uploader、镜像和插件，会从 kwargs 中取出相应参数"""
+        uploader_names = _as_uploader_list(kwargs.pop('uploader', ''))
+        mirror_names = _as_uploader_list(kwargs.pop('mirrors', []))
         plugins = kwargs.pop('plugins', [])
 
-        if not uploader_name:       # 用户没有指定名字
+        matched_rule = None
+        if not uploader_names:       # 用户没有指定名字
             # 尝试搜索匹配规则
             matched_rule = self._search_rule(path)
             if matched_rule:
-                uploader_name = matched_rule.uploader
-                plugins = matched_rule.plugins
-
-        uploader = self.get_uploader(uploader_name)
+                uploader_names = matched_rule.uploaders
+                plugins = matched_rule.plugins or []
+
+        # 指定了多个 Uploader 时，第一个为主上传，其余的作为镜像
+        if uploader_names:
+            uploader_names, mirror_names = uploader_names[:1], uploader_names[1:] + mirror_names
+        uploader = self.get_uploader(uploader_names[0] if uploader_names else '')
+        # 去掉重复的镜像，保持原有顺序
+        mirrors = [self.get_uploader(name) for name in dict.fromkeys(mirror_names)
+                   if name != uploader.name]
+        return matched_rule, uploader, mirrors, plugins
+
+    def plan(self, paths: Iterable[Union[str, Path]], **kwargs) -> UploadPlan:
+        """生成上传计划：匹配规则、计算哈希、查询历史，不访问网络
+
+        参数与 ``run_upload`` 相同，对所有文件生效。
+        """
+        paths = [Path(p) for p in paths]
+        for path in paths:
+            if not path.is_file():
+                raise FileNotFoundError(f'{path} 不存在。')
+        with ThreadPoolExecutor(max_workers=HASH_WORKERS) as executor:
+            file_keys = list(executor.map(self._file_key, paths))
+
+        with self._history_lock:
+            self._load_history_data()
+            history_data = self._history_data.copy()
+
+        items = []
+        for path, file_key in zip(paths, file_keys):
+            item_kwargs = kwargs.copy()
+            rule, uploader, mirrors, plugins = self._resolve(path, item_kwargs)
+            save_history = item_kwargs.pop('save_history', True)
+            file_history = history_data.get(file_key, {}) if save_history else {}
+            hits = {u.name: file_history[u.unique_id] for u in [uploader] + mirrors
+                    if file_history.get(u.unique_id)}
+            items.append(PlanItem(path=path,
+                                  file_key=file_key,
+                                  size=path.stat().st_size,
+                                  uploader=uploader.name,
+                                  mirrors=[m.name for m in mirrors],
+                                  rule=rule.name if rule else None,
+                                  plugins=plugins,
+                                  kwargs=item_kwargs,
+                                  hits=hits,
+                                  save_history=save_history))
+        return UploadPlan(self, items)
+
+    def run_plan_item(self, item: PlanItem):
+        """执行上传计划中的一项
+
+        文件在生成计划后被修改时，使用新的哈希，避免把新内容的链接记录到旧内容下。
+        """
+        if not item.path.is_file():
+            raise FileNotFoundError(f'{item.path} 不存在。')
+        file_key = self._file_key(item.path)
+        if file_key != item.file_key:
+            print(f'{item.path} has changed since planned, re-hashed.')
+            item.file_key = file_key
+            item.size = item.path.stat().st_size
+        uploader = self.get_uploader(item.uploader)
+        mirrors = [self.get_uploader(name) for name in item.mirrors]
+        plugins = item.plugins or []
+        kwargs = dict(item.kwargs or {})
+        if not item.save_history:
+            self._upload_mirrors(item.path, mirrors, kwargs)
+            return self._upload(item.path, uploader.upload, plugins, kwargs)
+        return self._upload_with_history_data(item.path, uploader, plugins, kwargs, mirrors,
+                                              file_key=file_key)
+
+    def _file_key(self, path: Path) -> str:
+        """文件的 md5，按文件大小和修改时间缓存，压缩时也会复用"""
+        return cached_md5(path)
+
+    def _upload_with_history_data(self, path, uploader, plugins, kwargs, mirrors=(), file_key=None):
+        file_key = file_key or self._file_key(path)
+        with self._history_context(path, file_key) as history:
+            # 镜像先在后台开始上传，与主上传并发进行
+            mirrors = [m for m in mirrors if not history.get(m.unique_id)]
+            self._upload_mirrors(path, mirrors, kwargs, file_key)
 
-        save_history = kwargs.pop('save_history', True)
-        if save_history:
-            return self._upload_with_history_data(path, uploader, plugins, kwargs)
-        else:
-            return self._upload(path, uploader.upload_method, plugins, kwargs)
-
-    def _upload_with_history_data(self, path, uploader, plugins, kwargs):
-        with self._history_context(path) as history:
             key = uploader.unique_id
             url = history.get(key)
 
@@ -297,11 +551,64 @@ class UploaderProxy:
                     return url
             else:
                 def method(p, **kws):
-                    history[key] = uploader.upload_method(p, **kws)
+                    history[key] = uploader.upload(p, **kws)
                     return history[key]
 
             return self._upload(path, method, plugins, kwargs)
 
+    def _upload_mirrors(self, path, mirrors, kwargs, file_key=None):
+        """在后台线程中把文件上传到镜像，完成后记录到同一条历史数据中"""
+        if not mirrors:
+            return
+        if self._mirror_executor is None:
+            # 线程数按 Uploader 的最大并发数，实际并发由各自的 limiter 控制
+            workers = max(MIRROR_WORKERS, self.max_concurrency())
+            self._mirror_executor = ThreadPoolExecutor(max_workers=workers,
+                                                       thread_name_prefix='oneupload-mirror')
+
+        # 其他参数往往只对特定客户端有效，镜像只沿用重命名
+        mirror_kwargs = {k: v for k, v in kwargs.items() if k == 'rename'}
+
+        def mirror_upload(m: Uploader):
+            try:
+                url = m.upload(path, **mirror_kwargs)
+            except Exception as err:
+                print(f'Mirror upload failed: {m.name}: {err}')
+                raise
+            if file_key:
+                self._update_history(file_key, {m.unique_id: url})
+            return url
+
+        for mirror in mirrors:
+            future = self._mirror_executor.submit(mirror_upload, mirror)
+            with self._history_lock:
+                self._mirror_futures.add(future)
+            future.add_done_callback(self._mirror_done)
+
+    def _mirror_done(self, future: Future):
+        # 完成的镜像上传只保留计数，不保留 Future，避免不调用 wait_mirrors 时无限增长
+        with self._history_lock:
+            if future not in self._mirror_futures:
+                return
+            self._mirror_futures.remove(future)
+            if future.exception() is None:
+                self._mirror_stats['done'] += 1
+            else:
+                self._mirror_stats['failed'] += 1
+
+    def wait_mirrors(self, timeout=None) -> Dict[str, int]:
+        """等待后台的镜像上传完成，返回上次调用以来成功和失败的数量，以及超时后仍未完成的数量"""
+        with self._history_lock:
+            futures = list(self._mirror_futures)
+        done, _ = wait(futures, timeout=timeout)
+        # wait 返回时回调可能还没执行，这里先行处理，回调会跳过已处理的
+        for future in done:
+            self._mirror_done(future)
+        with self._history_lock:
+            result = dict(self._mirror_stats, pending=len(self._mirror_futures))
+            self._mirror_stats = {'done': 0, 'failed': 0}
+        return result
+
     def _upload(self, path, method, plugins, kwargs):
         for plugin_name in plugins:
             plugin = self._plugins[plugin_name]
@@ -311,32 +618,78 @@ class UploaderProxy:
         except Exception as err:
             raise UploadError(f'Exception happens when upload: {err}')
 
+    def _history_file_stat(self):
+        try:
+            stat = self._history_data_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
     def _load_history_data(self):
-        if self._history_data_path.is_file():
+        # 有未保存的修改，或者文件没有变化时，不需要重新读取
+        if self._history_dirty:
+            return
+        stat = self._history_file_stat()
+        if stat is not None and stat == self._history_stat:
+            return
+        if stat is not None:
             self._history_data = json.loads(self._history_data_path.read_text(encoding='utf-8'))
         else:
             self._history_data = {}
+        self._history_stat = stat
+        self._history_version += 1
 
     def _save_history_data(self):
         self._history_data_path.write_text(json.dumps(self._history_data), encoding='utf-8')
+        self._history_stat = self._history_file_stat()
+        self._history_dirty = False
+        self._history_saved_at = time.monotonic()
+
+    def _update_history(self, file_key, data: Dict[str, Any]):
+        """合并一条历史数据并写回文件，可以在多个线程中调用"""
+        with self._history_lock:
+            self._load_history_data()
+            self._history_data.setdefault(file_key, {}).update(data)
+            self._history_version += 1
+            if (self._history_deferred
+                    and time.monotonic() - self._history_saved_at < HISTORY_FLUSH_INTERVAL):
+                self._history_dirty = True
+            else:
+                self._save_history_data()
 
     @contextlib.contextmanager
-    def _history_context(self, path):
-        self._load_history_data()
-        file_key = md5(path)
-        now = datetime.now().isoformat(timespec='seconds')
-        file_history = self._history_data.setdefault(file_key, {})
+    def defer_history_save(self):
+        """批量上传时推迟保存历史数据，每隔一段时间以及退出时才写入文件"""
+        with self._history_lock:
+            self._history_deferred += 1
+        try:
+            yield self
+        finally:
+            with self._history_lock:
+                self._history_deferred -= 1
+                if not self._history_deferred and self._history_dirty:
+                    self._save_history_data()
+
+    @contextlib.contextmanager
+    def _history_context(self, path, file_key=None):
+        file_key = file_key or self._file_key(path)
+        with self._history_lock:
+            self._load_history_data()
+            file_history = dict(self._history_data.get(file_key, {}))
         if not file_history:
+            now = datetime.now().isoformat(timespec='seconds')
             file_history.update({'_path': path.absolute().as_posix(),
                                  '_created_at': now,
                                  })
         try:
             yield file_history
         finally:
-            self._save_history_data()
+            self._update_history(file_key, file_history)
 
     def _search_rule(self, path: Path) -> Optional[UploadRule]:
-        pass
+        for rule in self._rules.values():
+            if rule.match(path):
+                return rule
 
     def _auto_select(self) -> Uploader:
         if self._selected_uploader:
@@ -361,12 +714,87 @@ class UploaderProxy:
         else:
             return self._auto_select()
 
+    def max_concurrency(self, names: Optional[List[str]] = None) -> int:
+        """指定的（默认为所有可用的）Uploader 中最大的并发上限，用于确定线程池大小"""
+        if names:
+            uploaders = [self.get_uploader(name) for name in names]
+        else:
+            uploaders = [u for u in self._uploaders.values() if u.available()]
+        return max((u.limiter.maximum for u in uploaders), default=1)
+
     def select(self, name='') -> 'UploaderProxy':
         """Select an uploader entity as the current one."""
         upr = self.get_uploader(name)
         self._selected_uploader = upr
         return self
 
+    def _reverse_index(self) -> Dict[str, LinkRecord]:
+        # 索引只在历史数据变化后重新生成，调用方不能修改返回的字典
+        with self._history_lock:
+            self._load_history_data()
+            if self._link_index and self._link_index[0] == self._history_version:
+                return self._link_index[1]
+            index = {}
+            for file_key, file_history in self._history_data.items():
+                path = file_history.get('_path')
+                for key, url in file_history.items():
+                    if not key.startswith('_'):
+                        index[url] = LinkRecord(file_key, path, key)
+            self._link_index = (self._history_version, index)
+            return index
+
+    def reverse_index(self) -> Dict[str, LinkRecord]:
+        """从历史数据生成链接到 (文件哈希, 本地路径, Uploader unique_id) 的索引"""
+        return dict(self._reverse_index())
+
+    def find_url(self, url: str) -> Optional[LinkRecord]:
+        """查询链接来自哪个本地文件；历史中没有时，尝试找出链接所属的 Uploader"""
+        record = self._reverse_index().get(url)
+        if record:
+            return record
+        for uploader in self._uploaders.values():
+            if uploader.match(url):
+                return LinkRecord(None, None, uploader.unique_id)
+        return None
+
+    def check_links(self, reupload=True, max_workers=MAX_WORKERS, timeout=None) -> Dict[str, Any]:
+        """并发检查历史中所有链接，并把失效（404、410）的链接重新上传
+
+        只有本地文件仍然存在且内容没有变化时才会重新上传。超时、限流、服务端错误等
+        无法确定状态的链接放在 ``unknown`` 中，不会重新上传。
+        """
+        index = self.reverse_index()
+        kwargs = {'max_workers': max_workers}
+        if timeout:
+            kwargs['timeout'] = timeout
+        statuses = LinkChecker(**kwargs).check_all(index)
+        broken = {url: index[url] for url, status in statuses.items() if is_broken(status)}
+        unknown = {url: status for url, status in statuses.items()
+                   if not is_alive(status) and not is_broken(status)}
+
+        reuploaded = {}
+        if reupload:
+            uploaders = {u.unique_id: u for u in self._uploaders.values() if u.available()}
+            for url, record in broken.items():
+                uploader = uploaders.get(record.uploader)
+                path = Path(record.path) if record.path else None
+                if uploader is None or path is None or not path.is_file():
+                    print(f'Cannot re-upload {url}: uploader or local file missing.')
+                    continue
+                if md5(path) != record.file_key:
+                    print(f'Cannot re-upload {url}: {path} has changed.')
+                    continue
+                try:
+                    # 使用原来的远程文件名，保证重新上传后链接不变
+                    new_url = uploader.upload(path, rename=_remote_name(url))
+                except Exception as err:
+                    print(f'Re-upload failed: {url}: {err}')
+                    continue
+                self._update_history(record.file_key, {record.uploader: new_url})
+                reuploaded[url] = new_url
+        return {'checked': len(statuses), 'broken': broken, 'unknown': unknown,
+                'reuploaded': reuploaded}
+
     def show_history(self):
         print(self._history_data)
         return self._history_data
@@ -0,0 +1,184 @@
+"""根据服务端的反馈自适应调整并发数
+
+每个 Uploader 一个 ``AdaptiveLimiter``，使用 AIMD（加性增、乘性减）：
+
+- 请求正常完成且延迟没有明显上升时，并发上限缓慢增加；
+- 延迟明显高于基线时，小幅降低并发上限；
+- 遇到限流（429、503 SlowDown、GitHub 二级限流的 403）时，并发上限减半，
+  并在 ``Retry-After`` 或 ``X-RateLimit-Reset`` 指定的时间之前暂停新的请求；
+- ``X-RateLimit-Remaining`` 快用完时，提前降低并发，避免触发限流。
+"""
+import time
+import random
+import threading
+from typing import Mapping, Optional
+
+THROTTLE_STATUS = (429, 503)
+
+# 计算延迟时按文件大小折算，每 1MB 算作一个请求，避免大文件被误判为过载
+SIZE_UNIT = 1024 * 1024
+
+# 限流但没有给出等待时间时，最多暂停的秒数，一般暂停一个基线延迟
+THROTTLE_PAUSE = 0.2
+
+# 被限流后重试前的等待时间：BACKOFF_BASE * 2^n 秒，最多 BACKOFF_MAX 秒
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+
+def _get_header(headers: Optional[Mapping], name: str) -> Optional[str]:
+    if not headers:
+        return None
+    name = name.lower()
+    for k, v in headers.items():
+        if k.lower() == name:
+            return v
+    return None
+
+
+def _exc_status(exc: BaseException) -> Optional[int]:
+    # HTTPError 使用 code，oss2 和 S3Error 使用 status
+    status = getattr(exc, 'status', None) or getattr(exc, 'code', None)
+    return status if isinstance(status, int) else None
+
+
+def is_throttle_error(exc: BaseException) -> bool:
+    """异常是否表示被服务端限流"""
+    status = _exc_status(exc)
+    if status in THROTTLE_STATUS:
+        return True
+    if status == 403:
+        headers = getattr(exc, 'headers', None)
+        return (_get_header(headers, 'Retry-After') is not None
+                or _get_header(headers, 'X-RateLimit-Remaining') == '0')
+    return False
+
+
+def backoff(attempt: int) -> float:
+    """第 attempt 次（从 0 开始）被限流后的等待秒数，带随机抖动，避免重试集中在同一时刻"""
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class AdaptiveLimiter:
+    def __init__(self, initial=4, minimum=1, maximum=32,
+                 decrease=0.5, latency_factor=3.0):
+        """
+
+        :param initial: 初始并发上限
+        :param minimum: 最小并发上限
+        :param maximum: 最大并发上限
+        :param decrease: 限流时并发上限乘以该系数
+        :param latency_factor: 延迟超过基线的多少倍时认为服务端过载
+        """
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.in_flight = 0
+        self.baseline: Optional[float] = None  # 基线延迟，取观测到的较低值
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                wait = self._blocked_until - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    break
+                self._cond.wait(timeout=wait if wait > 0 else None)
+            self.in_flight += 1
+
+    def release(self, latency: Optional[float] = None, throttled=False):
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self._decrease(self.decrease)
+            elif latency is not None:
+                self._on_latency(latency)
+            self._cond.notify_all()
+
+    def slot(self, size=0) -> '_Slot':
+        """占用一个并发名额，退出时根据耗时或异常调整并发上限
+
+        :param size: 本次上传的字节数，用于折算延迟
+        """
+        return _Slot(self, size)
+
+    def _on_latency(self, latency: float):
+        if self.baseline is None or latency < self.baseline:
+            self.baseline = latency
+        else:
+            # 基线缓慢上移，适应文件大小等带来的正常变化
+            self.baseline += (latency - self.baseline) * 0.05
+        if latency > self.baseline * self.latency_factor:
+            self._decrease(0.9)
+        else:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def _decrease(self, factor: float):
+        now = time.monotonic()
+        # 同一批并发请求同时失败时只降一次
+        if now - self._last_decrease < (self.baseline or 0.0):
+            return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit * factor)
+
+    def pause(self, seconds: float):
+        """在指定时间内不再发出新的请求"""
+        with self._cond:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def observe_headers(self, headers: Optional[Mapping], throttled=False):
+        """根据 Retry-After 和 X-RateLimit-* 响应头调整"""
+        retry_after = _get_header(headers, 'Retry-After')
+        if retry_after is not None:
+            try:
+                self.pause(float(retry_after))
+            except ValueError:
+                pass
+            return
+
+        remaining = _get_header(headers, 'X-RateLimit-Remaining')
+        reset = _get_header(headers, 'X-RateLimit-Reset')
+        if remaining is None or reset is None:
+            if throttled:
+                self.pause(min(THROTTLE_PAUSE, self.baseline or THROTTLE_PAUSE))
+            return
+        try:
+            remaining, reset = int(remaining), float(reset)
+        except ValueError:
+            return
+        until_reset = max(0.0, reset - time.time())
+        if remaining <= 0:
+            self.pause(until_reset)
+            return
+        with self._cond:
+            # 剩余次数不足以支撑当前并发时，按剩余次数收紧上限
+            if remaining < self.limit * 10:
+                self.limit = max(self.minimum, min(self.limit, remaining / 10))
+
+
+class _Slot:
+    def __init__(self, limiter: AdaptiveLimiter, size=0):
+        self.limiter = limiter
+        self.units = max(1.0, size / SIZE_UNIT)
+        self.start = None
+
+    def __enter__(self):
+        self.limiter.acquire()
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            throttled = is_throttle_error(exc)
+            self.limiter.release(throttled=throttled)
+            if throttled:
+                self.limiter.observe_headers(getattr(exc, 'headers', None), throttled=True)
+        else:
+            latency = (time.monotonic() - self.start) / self.units
+            self.limiter.release(latency=latency)
+        return False
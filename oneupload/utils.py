@@ -3,9 +3,10 @@ import os
 import sys
 import uuid
 import importlib
+import threading
 from pathlib import Path
 
-from typing import Dict
+from typing import Dict, Tuple
 
 
 WIN = sys.platform.startswith("win")
@@ -81,12 +82,33 @@ def import_module(path: str):
     return mod, attr
 
 
-def md5(path: Path):
+def md5(path: Path, chunk_size=1024 * 1024):
     md = hashlib.md5()
-    md.update(path.read_bytes())
+    with path.open('rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            md.update(chunk)
     return md.hexdigest()
 
 
+_md5_cache: Dict[str, Tuple[int, int, str]] = {}
+_md5_lock = threading.Lock()
+
+
+def cached_md5(path: Path) -> str:
+    """文件的 md5，按文件大小和修改时间缓存，同一个文件在一次运行中只读一遍"""
+    path = Path(path)
+    stat = path.stat()
+    cache_key = path.absolute().as_posix()
+    with _md5_lock:
+        cached = _md5_cache.get(cache_key)
+    if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        return cached[2]
+    digest = md5(path)
+    with _md5_lock:
+        _md5_cache[cache_key] = (stat.st_size, stat.st_mtime_ns, digest)
+    return digest
+
+
 def unique_id(ns: uuid.UUID, name: str, data: Dict):
     data_text = ','.join([f"{k}={v}" for k, v in sorted(data.items())])
     uid = uuid.uuid3(ns, name + data_text)
@@ -0,0 +1,142 @@
+import io
+import json
+import sys
+import threading
+
+import pytest
+
+from oneupload import cli
+
+
+@pytest.fixture
+def config(tmp_path):
+    path = tmp_path / 'user.toml'
+    path.write_text("""
+[uploader.a]
+client = 'command'
+cmd_template = 'true ${file_path}'
+url_template = 'https://a.example.com/${name}'
+
+[uploader.b]
+client = 'command'
+cmd_template = 'true ${file_path}'
+url_template = 'https://b.example.com/${name}'
+
+# 生成链接时缺少变量，每次上传都会失败
+[uploader.broken]
+client = 'command'
+cmd_template = 'true ${file_path}'
+url_template = 'https://broken.example.com/${missing}'
+""", encoding='utf-8')
+    return path
+
+
+def _files(tmp_path, count):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f'f{i}.png'
+        path.write_text(str(i))
+        paths.append(path)
+    return paths
+
+
+class SlowStdin:
+    """每读一行后等待上一行的结果输出，结果没有及时输出时超时"""
+
+    def __init__(self, lines, output):
+        self.lines = lines
+        self.output = output
+
+    def __iter__(self):
+        for i, line in enumerate(self.lines):
+            yield line + '\n'
+            assert self.output.wait_lines(i + 1), 'result was not streamed'
+
+
+class RecordingOutput(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self._cond = threading.Condition()
+
+    def write(self, text):
+        with self._cond:
+            n = super().write(text)
+            self._cond.notify_all()
+            return n
+
+    def wait_lines(self, count, timeout=10):
+        with self._cond:
+            return self._cond.wait_for(lambda: self.getvalue().count('\n') >= count, timeout)
+
+
+def test_upload_streams_results_before_stdin_ends(tmp_path, config, monkeypatch):
+    paths = _files(tmp_path, 3)
+    out = RecordingOutput()
+    monkeypatch.setattr(sys, 'stdin', SlowStdin([p.as_posix() for p in paths], out))
+    monkeypatch.setattr(sys, 'stdout', out)
+    assert cli.main(['--config', str(config), '--home', str(tmp_path / 'home'),
+                     '-u', 'a', '--no-history']) == 0
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r['url'] for r in results] == [f'https://a.example.com/f{i}.png' for i in range(3)]
+
+
+def test_upload_ndjson_jobs_and_errors(tmp_path, config, monkeypatch):
+    local = _files(tmp_path, 1)[0]
+    lines = [json.dumps({'path': local.as_posix(), 'uploader': 'b', 'rename': 'x.png', 'id': 7}),
+             '{bad', (tmp_path / 'missing.png').as_posix()]
+    monkeypatch.setattr(sys, 'stdin', io.StringIO('\n'.join(lines)))
+    out = io.StringIO()
+    monkeypatch.setattr(sys, 'stdout', out)
+    assert cli.main(['--config', str(config), '--home', str(tmp_path / 'home')]) == 1
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert {'path': local.as_posix(), 'id': 7, 'url': 'https://b.example.com/x.png'} in results
+    assert sum('error' in r for r in results) == 2
+
+
+class ClosedAfter(io.StringIO):
+    """写入若干行之后像 ``| head`` 一样关闭管道"""
+
+    def __init__(self, lines):
+        super().__init__()
+        self.lines = lines
+
+    def write(self, text):
+        if self.getvalue().count('\n') >= self.lines:
+            raise BrokenPipeError()
+        return super().write(text)
+
+
+def test_broken_pipe_finishes_in_flight_uploads(tmp_path, config, monkeypatch):
+    paths = _files(tmp_path, 30)
+    home = tmp_path / 'home'
+    monkeypatch.setattr(sys, 'stdin', io.StringIO('\n'.join(p.as_posix() for p in paths)))
+    out = ClosedAfter(5)
+    monkeypatch.setattr(sys, 'stdout', out)
+    assert cli.main(['--config', str(config), '--home', str(home), '-u', 'a', '-u', 'b']) == 0
+    assert out.getvalue().count('\n') == 5
+
+    history = json.loads((home / 'history.json').read_text(encoding='utf-8'))
+    uploaded = [entry for entry in history.values() if 'a' in entry]
+    # 已经开始的上传及其镜像都完整记录
+    assert all('b' in entry for entry in uploaded)
+
+
+def test_mirror_failures_set_exit_code(tmp_path, config, monkeypatch, capsys):
+    local = _files(tmp_path, 1)[0]
+    assert cli.main(['--config', str(config), '--home', str(tmp_path / 'home'),
+                     '-u', 'a', '-u', 'broken', local.as_posix()]) == 1
+    captured = capsys.readouterr()
+    assert json.loads(captured.out) == {'path': local.as_posix(),
+                                        'url': 'https://a.example.com/f0.png'}
+    assert '1 mirror upload(s) failed' in captured.err
+
+
+@pytest.mark.parametrize('command', ['upload', 'plan'])
+def test_unknown_uploader_is_a_clean_error(tmp_path, config, capsys, command):
+    local = _files(tmp_path, 1)[0]
+    assert cli.main([command, '--config', str(config), '--home', str(tmp_path / 'home'),
+                     '-u', 'nope', local.as_posix()]) == 2
+    captured = capsys.readouterr()
+    assert captured.out == ''
+    assert 'oneupload: error: 指定的 Uploader 不存在: nope' in captured.err
+    assert 'Traceback' not in captured.err
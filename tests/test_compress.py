@@ -0,0 +1,110 @@
+import gzip
+import importlib
+import os
+import sys
+import types
+
+import pytest
+
+from oneupload import compress
+from oneupload.compress import Compressor
+
+TEXT = b'[' + b','.join(b'{"k": %d}' % i for i in range(2000)) + b']'
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(compress, '_cache', type(compress._cache)())
+    monkeypatch.setattr(compress, '_cache_bytes', 0)
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+    origin = Compressor._compress
+
+    def counting(self, content):
+        calls.append(self.encoding)
+        return origin(self, content)
+
+    monkeypatch.setattr(Compressor, '_compress', counting)
+    return calls
+
+
+def test_compress_text():
+    content, headers = Compressor('gzip').compress('a.json', TEXT)
+    assert gzip.decompress(content) == TEXT
+    assert headers == {'Content-Type': 'application/json', 'Content-Encoding': 'gzip'}
+
+
+@pytest.mark.parametrize('name, data', [('small.json', b'{"k": 1}'),
+                                        ('a.png', TEXT)])
+def test_skip_small_or_binary(calls, name, data):
+    content, headers = Compressor('gzip').compress(name, data)
+    assert content == data
+    assert 'Content-Encoding' not in headers
+    assert not calls
+
+
+def test_keep_original_when_not_smaller():
+    data = os.urandom(4096)
+    content, headers = Compressor('gzip').compress('a.json', data)
+    assert content == data
+    assert headers == {'Content-Type': 'application/json'}
+
+
+def test_br_falls_back_to_gzip(monkeypatch):
+    monkeypatch.setattr(compress, 'brotli', None)
+    assert Compressor('br').encoding == 'gzip'
+
+
+def test_cache_shared_between_compressors(calls, tmp_path):
+    local = tmp_path / 'a.json'
+    local.write_bytes(TEXT)
+    first = Compressor('gzip').compress('a.json', TEXT, path=local)
+    second = Compressor('gzip').compress('mirror/a.json', TEXT)
+    assert first == second
+    assert calls == ['gzip']
+
+
+def test_cache_byte_budget(calls, monkeypatch):
+    monkeypatch.setattr(compress, 'CACHE_BYTES', len(gzip.compress(TEXT, 9, mtime=0)) + 10)
+    compressor = Compressor('gzip')
+    other = TEXT.replace(b'"k"', b'"v"')
+    compressor.compress('a.json', TEXT)
+    compressor.compress('b.json', other)  # 超出预算，淘汰 a.json 的结果
+    compressor.compress('a.json', TEXT)
+    assert len(calls) == 3
+    assert compress._cache_bytes <= compress.CACHE_BYTES
+
+
+class FakeBucket:
+    def __init__(self, auth, endpoint, bucket_name):
+        self.bucket_name = bucket_name
+        self.puts = []
+
+    def put_object(self, key, content, headers=None):
+        self.puts.append((key, content, headers))
+
+
+@pytest.fixture
+def alioss(monkeypatch):
+    oss2 = types.ModuleType('oss2')
+    oss2.Auth = lambda key, secret: None
+    oss2.Bucket = FakeBucket
+    monkeypatch.setitem(sys.modules, 'oss2', oss2)
+    sys.modules.pop('oneupload.clients.alioss', None)
+    yield importlib.import_module('oneupload.clients.alioss')
+    sys.modules.pop('oneupload.clients.alioss', None)
+
+
+def test_alioss_sends_compression_headers(alioss, tmp_path):
+    local = tmp_path / 'a.json'
+    local.write_bytes(TEXT)
+    client = alioss.AliOSS('key', 'secret', 'bkt', 'oss-cn-shanghai.aliyuncs.com',
+                           path='img', compress='gzip')
+    assert client.upload(local) == 'https://bkt.oss-cn-shanghai.aliyuncs.com/img/a.json'
+    key, content, headers = client.bucket.puts[0]
+    assert key == 'img/a.json'
+    assert gzip.decompress(content) == TEXT
+    assert headers == {'Content-Type': 'application/json', 'Content-Encoding': 'gzip'}
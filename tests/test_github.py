@@ -0,0 +1,98 @@
+import base64
+import io
+import json
+from urllib.error import HTTPError
+
+import pytest
+
+from oneupload.clients.github import GitHub, ContentBody, github_sha, github_file_sha
+from oneupload.proxy import UploaderProxy
+
+CHUNK = 3 * 4
+
+
+@pytest.mark.parametrize('size', [0, 1, CHUNK - 1, CHUNK, CHUNK + 1, CHUNK * 3 + 2])
+def test_content_body_matches_file(tmp_path, size):
+    local = tmp_path / 'a.bin'
+    content = bytes(range(256)) * (size // 256) + bytes(range(size % 256))
+    local.write_bytes(content)
+    body = ContentBody(local, chunk_size=CHUNK, message='upload a.bin', sha=None)
+
+    data = b''.join(body)
+    assert len(data) == len(body)
+    decoded = json.loads(data)
+    assert decoded['message'] == 'upload a.bin'
+    assert decoded['sha'] is None
+    assert base64.b64decode(decoded['content']) == content
+    # 可以重复迭代，用于重试
+    assert b''.join(body) == data
+    assert github_file_sha(local, chunk_size=CHUNK) == github_sha(content)
+
+
+class StubGitHub(GitHub):
+    """不访问网络：文件已存在时第一次创建返回 422"""
+
+    def __init__(self, remote_content):
+        super().__init__('owner', 'repo', 'token', path='img')
+        self.remote_sha = github_sha(remote_content)
+        self.puts = []
+
+    def put(self, url, data):
+        body = json.loads(b''.join(data))
+        self.puts.append(body)
+        if body['sha'] is None:
+            raise HTTPError(url, 422, 'Unprocessable Entity', {}, io.BytesIO(b'{}'))
+        assert body['sha'] == self.remote_sha
+        return {}
+
+    def get_content(self, path):
+        return {'sha': self.remote_sha}
+
+
+@pytest.fixture
+def local(tmp_path):
+    path = tmp_path / 'a.png'
+    path.write_bytes(b'png')
+    return path
+
+
+def test_upload_existing_same_content(local):
+    client = StubGitHub(b'png')
+    url = client.upload(local)
+    assert url == 'https://raw.githubusercontent.com/owner/repo/main/img/a.png'
+    assert len(client.puts) == 1
+
+
+def test_upload_existing_overwrite(local):
+    client = StubGitHub(b'old')
+    client.upload(local)
+    assert [p['sha'] for p in client.puts] == [None, client.remote_sha]
+    assert base64.b64decode(client.puts[1]['content']) == b'png'
+
+
+def test_upload_existing_no_overwrite(local):
+    client = StubGitHub(b'old')
+    client.upload(local, overwrite=False)
+    assert len(client.puts) == 1
+
+
+def test_uploader_defaults_to_client_concurrency(tmp_path):
+    config = tmp_path / 'user.toml'
+    config.write_text("""
+[uploader.gh]
+client = 'github'
+owner = 'owner'
+repo = 'repo'
+token = 'token'
+
+[uploader.gh2]
+client = 'github'
+owner = 'owner'
+repo = 'repo2'
+token = 'token'
+max_concurrency = 2
+""", encoding='utf-8')
+    proxy = UploaderProxy(config_path=config, home=tmp_path / 'home')
+    assert proxy.get_uploader('gh').limiter.maximum == 1
+    assert proxy.get_uploader('gh').limiter.limit == 1
+    assert proxy.get_uploader('gh2').limiter.maximum == 2
@@ -0,0 +1,152 @@
+import json
+import socket
+import threading
+import time
+import http.server
+
+import pytest
+
+from oneupload.linkcheck import LinkChecker
+from oneupload.proxy import UploaderProxy
+from oneupload.utils import md5
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        Handler.connections += 1
+
+    def do_HEAD(self):
+        if self.path.startswith('/slow/'):
+            time.sleep(1)
+        if self.path.startswith('/dead/'):
+            status = 404
+        elif self.path.startswith('/busy/'):
+            status = 503
+        else:
+            status = 200
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.connections = 0
+    srv = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{srv.server_port}'
+    srv.shutdown()
+    srv.server_close()
+
+
+def _unused_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_check_all_20k_links(server):
+    urls = [f'{server}/f/{i}' for i in range(20000)] + [f'{server}/dead/x']
+    checker = LinkChecker(max_workers=32)
+    start = time.perf_counter()
+    statuses = checker.check_all(urls)
+    elapsed = time.perf_counter() - start
+
+    assert len(statuses) == 20001
+    assert statuses[f'{server}/dead/x'] == 404
+    assert sum(status == 200 for status in statuses.values()) == 20000
+    assert elapsed < 60
+    # 每个线程复用一个连接
+    assert Handler.connections <= 32
+    assert not checker._connections
+
+
+def test_unreachable_host_fails_fast():
+    base = f'http://127.0.0.1:{_unused_port()}'
+    checker = LinkChecker(max_workers=4, timeout=5)
+    statuses = checker.check_all(f'{base}/{i}' for i in range(100))
+    assert set(statuses.values()) == {0}
+    assert checker._dead_hosts == {base[len('http://'):]}
+
+
+def test_timeout_does_not_mark_host_dead(server):
+    urls = [f'{server}/slow/x'] + [f'{server}/f/{i}' for i in range(53)]
+    checker = LinkChecker(max_workers=1, timeout=0.2)
+    statuses = checker.check_all(urls)
+    assert statuses[f'{server}/slow/x'] == 0
+    assert [statuses[url] for url in urls[1:]] == [200] * 53
+    assert not checker._dead_hosts
+
+
+def test_check_links_reuploads_with_original_name(server, tmp_path):
+    local = tmp_path / 'a.png'
+    local.write_bytes(b'png')
+    busy = tmp_path / 'b.png'
+    busy.write_bytes(b'busy')
+    config = tmp_path / 'user.toml'
+    config.write_text(f"""
+[uploader.cmd]
+client = 'command'
+cmd_template = 'true ${{file_path}}'
+url_template = '{server}/ok/${{name}}'
+""", encoding='utf-8')
+    home = tmp_path / 'home'
+    home.mkdir()
+    file_key = md5(local)
+    dead_url = f'{server}/dead/published%20name.png'
+    (home / 'history.json').write_text(json.dumps({
+        file_key: {'_path': local.as_posix(), 'cmd': dead_url},
+        md5(busy): {'_path': busy.as_posix(), 'cmd': f'{server}/busy/b.png'},
+    }), encoding='utf-8')
+
+    proxy = UploaderProxy(config_path=config, home=home)
+    assert proxy.find_url(dead_url).file_key == file_key
+
+    report = proxy.check_links()
+    new_url = f'{server}/ok/published%20name.png'
+    assert report['checked'] == 2
+    assert report['reuploaded'] == {dead_url: new_url}
+    # 服务端暂时不可用时无法确定链接是否失效，不重新上传
+    assert report['unknown'] == {f'{server}/busy/b.png': 503}
+    assert proxy.reverse_index()[new_url].path == local.as_posix()
+
+
+def test_find_url_reuses_index_until_history_changes(tmp_path):
+    config = tmp_path / 'user.toml'
+    config.write_text("""
+[uploader.cmd]
+client = 'command'
+cmd_template = 'true ${file_path}'
+url_template = 'https://example.com/${name}'
+""", encoding='utf-8')
+    home = tmp_path / 'home'
+    home.mkdir()
+    (home / 'history.json').write_text(json.dumps({
+        'k1': {'_path': 'a.png', 'cmd': 'https://example.com/a.png'},
+    }), encoding='utf-8')
+    proxy = UploaderProxy(config_path=config, home=home)
+
+    assert proxy.find_url('https://example.com/a.png').file_key == 'k1'
+    index = proxy._link_index
+    proxy.find_url('https://example.com/missing.png')
+    assert proxy._link_index is index
+
+    # 本进程上传之后
+    local = tmp_path / 'b.png'
+    local.write_bytes(b'png')
+    proxy.run_upload(local)
+    assert proxy.find_url('https://example.com/b.png').file_key == md5(local)
+
+    # 其他进程修改历史文件之后
+    (home / 'history.json').write_text(json.dumps({
+        'k2': {'_path': 'c.png', 'cmd': 'https://example.com/c.png'},
+    }), encoding='utf-8')
+    assert proxy.find_url('https://example.com/c.png').file_key == 'k2'
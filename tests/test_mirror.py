@@ -0,0 +1,85 @@
+import threading
+
+import pytest
+
+from oneupload.proxy import UploaderProxy
+from oneupload.utils import md5
+
+
+class Gate:
+    """在 opened 被设置之前一直阻塞的镜像客户端"""
+    opened = threading.Event()
+    calls = []
+
+    def __init__(self, host, fail=False):
+        self.host = host
+        self.fail = fail
+        self.unique_id = host
+
+    def upload(self, path, rename=None):
+        self.calls.append(self.host)
+        assert self.opened.wait(10), 'gate was never opened'
+        if self.fail:
+            raise ConnectionError(f'{self.host} is down')
+        return f'https://{self.host}/{rename or path.name}'
+
+
+@pytest.fixture
+def proxy(tmp_path):
+    Gate.opened, Gate.calls = threading.Event(), []
+    config = tmp_path / 'user.toml'
+    config.write_text("""
+[client.gate]
+path = 'test_mirror:Gate'
+
+[uploader.a]
+client = 'command'
+cmd_template = 'true ${file_path}'
+url_template = 'https://a.example.com/${name}'
+
+[uploader.b]
+client = 'gate'
+host = 'b.example.com'
+
+[uploader.broken]
+client = 'gate'
+host = 'broken.example.com'
+fail = true
+""", encoding='utf-8')
+    proxy = UploaderProxy(config_path=config, home=tmp_path / 'home')
+    yield proxy
+    Gate.opened.set()
+    proxy.wait_mirrors()
+
+
+@pytest.fixture
+def local(tmp_path):
+    path = tmp_path / 'a.png'
+    path.write_bytes(b'png')
+    return path
+
+
+def test_returns_before_mirrors_finish(proxy, local):
+    assert proxy.run_upload(local, uploader=['a', 'b']) == 'https://a.example.com/a.png'
+    assert proxy.wait_mirrors(timeout=0.1) == {'done': 0, 'failed': 0, 'pending': 1}
+
+    Gate.opened.set()
+    assert proxy.wait_mirrors() == {'done': 1, 'failed': 0, 'pending': 0}
+    history = proxy.show_history()[md5(local)]
+    assert history['a'] == 'https://a.example.com/a.png'
+    assert history['b.example.com'] == 'https://b.example.com/a.png'
+
+
+def test_duplicate_mirrors_upload_once(proxy, local):
+    Gate.opened.set()
+    proxy.run_upload(local, uploader=['a', 'b', 'b'], mirrors=['b', 'a'])
+    assert proxy.wait_mirrors() == {'done': 1, 'failed': 0, 'pending': 0}
+    assert Gate.calls == ['b.example.com']
+
+
+def test_mirror_failures_are_counted(proxy, local):
+    Gate.opened.set()
+    url = proxy.run_upload(local, uploader='a', mirrors=['broken', 'b'])
+    assert url == 'https://a.example.com/a.png'
+    assert proxy.wait_mirrors() == {'done': 1, 'failed': 1, 'pending': 0}
+    assert 'broken.example.com' not in proxy.show_history()[md5(local)]
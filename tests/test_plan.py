@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+from oneupload import cli
+from oneupload.proxy import UploaderProxy
+from oneupload.utils import md5
+
+
+@pytest.fixture
+def config(tmp_path):
+    path = tmp_path / 'user.toml'
+    path.write_text("""
+[uploader.cmd]
+client = 'command'
+cmd_template = 'true ${file_path}'
+url_template = 'https://example.com/${name}'
+""", encoding='utf-8')
+    return path
+
+
+@pytest.fixture
+def proxy(tmp_path, config):
+    return UploaderProxy(config_path=config, home=tmp_path / 'home')
+
+
+def test_plan_then_execute(tmp_path, proxy):
+    local = tmp_path / 'a.png'
+    local.write_bytes(b'png')
+
+    plan = proxy.plan([local])
+    assert plan.items[0].status == 'upload'
+    assert plan.bytes_to_send == 3
+    assert plan.execute() == [{'path': local.as_posix(), 'url': 'https://example.com/a.png'}]
+
+    plan = proxy.plan([local])
+    assert plan.items[0].status == 'history'
+    assert plan.bytes_to_send == 0
+
+
+def test_execute_rehashes_changed_file(tmp_path, proxy):
+    local = tmp_path / 'new.png'
+    local.write_bytes(b'v1')
+    v1_key = md5(local)
+    plan = proxy.plan([local])
+
+    local.write_bytes(b'v2 changed')
+    plan.execute()
+
+    history = proxy.show_history()
+    assert v1_key not in history
+    assert history[md5(local)]['cmd'] == 'https://example.com/new.png'
+
+
+def test_execute_keeps_going_after_failure(tmp_path, proxy):
+    paths = []
+    for i in range(10):
+        path = tmp_path / f'{i}.png'
+        path.write_text(str(i))
+        paths.append(path)
+    plan = proxy.plan(paths)
+    paths[3].unlink()
+
+    streamed = []
+    results = plan.execute(on_result=streamed.append)
+    assert sorted(r['path'] for r in streamed) == sorted(r['path'] for r in results)
+    assert [r['path'] for r in results] == [p.as_posix() for p in paths]
+    assert 'error' in results[3]
+    assert sum('url' in r for r in results) == 9
+
+    history = json.loads((tmp_path / 'home' / 'history.json').read_text(encoding='utf-8'))
+    assert len(history) == 9
+
+
+def test_plan_without_history(tmp_path, proxy):
+    local = tmp_path / 'a.png'
+    local.write_bytes(b'png')
+    proxy.run_upload(local)
+
+    plan = proxy.plan([local], save_history=False)
+    assert plan.items[0].status == 'upload'
+    history_before = proxy.show_history().copy()
+    plan.execute()
+    assert proxy.show_history() == history_before
+
+
+def test_cli_plan_execute_json(tmp_path, config, capsys):
+    local = tmp_path / 'a.png'
+    local.write_bytes(b'png')
+    home = tmp_path / 'home'
+    assert cli.main(['plan', '--config', str(config), '--home', str(home),
+                     '--json', '--execute', str(local)]) == 0
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert lines[0]['status'] == 'upload'
+    assert lines[1] == {'path': local.as_posix(), 'url': 'https://example.com/a.png'}
+
+
+def test_cli_plan_execute_failure_exit_code(tmp_path, config, capsys, monkeypatch):
+    local = tmp_path / 'a.png'
+    local.write_bytes(b'png')
+    monkeypatch.setattr(UploaderProxy, 'run_plan_item', lambda self, item: 1 / 0)
+    assert cli.main(['plan', '--config', str(config), '--home', str(tmp_path / 'home'),
+                     '--execute', str(local)]) == 1
+    assert capsys.readouterr().out.splitlines()[-1] == f'{local.as_posix()}\tERROR: division by zero'
@@ -0,0 +1,82 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from oneupload import throttle
+from oneupload.proxy import Uploader, UploaderClient
+from oneupload.throttle import AdaptiveLimiter, backoff, is_throttle_error
+
+
+class SlowDown(Exception):
+    status = 503
+
+
+class Backend:
+    """同时处理的请求超过 capacity 时返回 503 SlowDown"""
+    capacity = 6
+
+    def __init__(self):
+        self.in_flight = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def upload(self, path):
+        with self._lock:
+            self.in_flight += 1
+            busy = self.in_flight > self.capacity
+        try:
+            if busy:
+                with self._lock:
+                    self.throttled += 1
+                raise SlowDown()
+            time.sleep(0.005)
+            return f'https://example.com/{path.name}'
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def test_backoff_grows_and_is_capped():
+    for attempt in range(10):
+        delay = min(throttle.BACKOFF_MAX, throttle.BACKOFF_BASE * 2 ** attempt)
+        assert delay / 2 <= backoff(attempt) <= delay
+    assert backoff(100) <= throttle.BACKOFF_MAX
+
+
+def test_is_throttle_error():
+    assert is_throttle_error(SlowDown())
+    assert not is_throttle_error(ValueError())
+
+
+def test_uploads_survive_throttling(tmp_path, monkeypatch):
+    monkeypatch.setattr(throttle, 'BACKOFF_BASE', 0.05)
+    local = tmp_path / 'a.png'
+    local.write_bytes(b'png')
+    client = UploaderClient('backend', path='test_throttle:Backend')
+    uploader = Uploader('backend', client=client, priority=5, args={},
+                        limiter=AdaptiveLimiter(initial=4, maximum=32))
+    backend = uploader.instance
+
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        results = list(executor.map(lambda _: uploader.upload(local), range(2000)))
+
+    assert results == ['https://example.com/a.png'] * 2000
+    assert backend.throttled > 0
+    # AIMD 会在容量附近来回波动，但不会一直涨到上限
+    assert uploader.limiter.limit <= Backend.capacity * 2
+
+
+@pytest.mark.parametrize('remaining, expected', [(0, 4), (20, 2)])
+def test_rate_limit_headers(remaining, expected):
+    limiter = AdaptiveLimiter(initial=4)
+    reset = str(time.time() + 0.2)
+    limiter.observe_headers({'X-RateLimit-Remaining': str(remaining),
+                             'X-RateLimit-Reset': reset})
+    assert limiter.limit == expected
+    if remaining == 0:
+        start = time.monotonic()
+        with limiter.slot():
+            pass
+        assert time.monotonic() - start >= 0.1